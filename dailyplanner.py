@@ -1,10 +1,21 @@
 # daily_planner_complete.py with background notifications, unified summarizer, and local storage
 
 import streamlit as st
+import numpy as np
 from datetime import date, datetime, timedelta, time as dtime
 import json
 import re
+import asyncio
 import base64
+import bisect
+import heapq
+import secrets
+import struct
+import threading
+import time
+import urllib.parse
+import zlib
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 
 try:
     from plyer import notification as plyer_notify
@@ -40,45 +51,986 @@ hr { border-color: rgba(0,0,0,0.06); }
 </style>
 """
 
+# ------------------ Snapshot Format ------------------
+# A snapshot is a small binary header, a table of named sections and the
+# zlib-compressed JSON body of each section.  The whole thing is base64
+# encoded and split into chunks so it fits in localStorage string values.
+SNAPSHOT_MAGIC = b"DPLN"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = ">4sBH"     # magic, version, section count
+SNAPSHOT_ENTRY = ">B%dsII"    # name length, name, offset, length
+STORAGE_KEY = "daily_planner_data"
+STORAGE_CHUNK_CHARS = 256 * 1024
+STORAGE_QUOTA_BYTES = 5 * 1024 * 1024  # typical per-origin localStorage limit
+
+def default_serializer(obj):
+    """JSON fallback for date and time values"""
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    elif isinstance(obj, dtime):
+        return obj.strftime('%H:%M:%S')
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+def parse_dates(obj):
+    """Convert string dates and times back to date/time objects in place"""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key == "Date" and isinstance(value, str):
+                try:
+                    obj[key] = datetime.fromisoformat(value).date()
+                except:
+                    pass
+            elif key == "Time" and isinstance(value, str):
+                try:
+                    obj[key] = datetime.strptime(value, '%H:%M:%S').time()
+                except:
+                    pass
+            elif isinstance(value, (dict, list)):
+                parse_dates(value)
+    elif isinstance(obj, list):
+        for item in obj:
+            parse_dates(item)
+    return obj
+
+def encode_snapshot(data: dict) -> str:
+    """Pack each top-level key of data into its own compressed section.
+    bytes values are taken as already-compressed section bodies."""
+    entries, bodies, offset = [], [], 0
+    for name, value in data.items():
+        if isinstance(value, bytes):
+            body = value
+        else:
+            body = zlib.compress(json.dumps(value, default=default_serializer,
+                                            separators=(",", ":")).encode("utf-8"), 9)
+        key = name.encode("utf-8")
+        entries.append(struct.pack(SNAPSHOT_ENTRY % len(key), len(key), key, offset, len(body)))
+        bodies.append(body)
+        offset += len(body)
+    header = struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(entries))
+    return base64.b64encode(header + b"".join(entries) + b"".join(bodies)).decode("ascii")
+
+def split_snapshot(encoded: str, chunk_chars: int = STORAGE_CHUNK_CHARS) -> list:
+    """Split an encoded snapshot into localStorage-sized chunks"""
+    return [encoded[i:i + chunk_chars] for i in range(0, len(encoded), chunk_chars)] or [""]
+
+def snapshot_usage(chunks: list) -> int:
+    """Approximate bytes the chunks occupy in localStorage (UTF-16 keys and values)"""
+    key_chars = sum(len(f"{STORAGE_KEY}.0.{i}") for i in range(len(chunks))) + len(STORAGE_KEY) + 64
+    return 2 * (sum(len(c) for c in chunks) + key_chars)
+
+class LazySnapshot:
+    """Read-only view of an encoded snapshot; sections are inflated on first access"""
+
+    def __init__(self, encoded: str, transform=None):
+        self._blob = base64.b64decode(encoded)
+        self._transform = transform
+        self._cache = {}
+        magic, version, count = struct.unpack_from(SNAPSHOT_HEADER, self._blob, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a planner snapshot")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        pos = struct.calcsize(SNAPSHOT_HEADER)
+        table = []
+        for _ in range(count):
+            name_len = self._blob[pos]
+            fmt = SNAPSHOT_ENTRY % name_len
+            _, name, offset, length = struct.unpack_from(fmt, self._blob, pos)
+            table.append((name.decode("utf-8"), offset, length))
+            pos += struct.calcsize(fmt)
+        self._sections = {name: (pos + offset, length) for name, offset, length in table}
+        self.version = version
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def keys(self):
+        return self._sections.keys()
+
+    def raw(self, name) -> bytes:
+        """Compressed body of a section, for writing it back unchanged"""
+        start, length = self._sections[name]
+        return self._blob[start:start + length]
+
+    def get(self, name, default=None, cache: bool = True):
+        if name in self._cache:
+            return self._cache[name]
+        if name not in self._sections:
+            return default
+        value = json.loads(zlib.decompress(self.raw(name)).decode("utf-8"))
+        if self._transform:
+            value = self._transform(value)
+        if cache:
+            self._cache[name] = value
+        return value
+
+# ------------------ Archive ------------------
+# Completed and past items are moved out of the working lists into compressed,
+# append-only segments. A small uncompressed index (collection, segment, id,
+# date, label, position) lists archived items without inflating anything.
+# Restoring leaves a null in the item's slot so positions never shift.
+# Each segment is saved as its own snapshot section and copied through as-is.
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_KINDS = ("tasks", "activities", "notes")
+ARCHIVE_SECTION = "archive:"
+
+def empty_archive() -> dict:
+    return {"segments": {}, "index": []}
+
+def archive_sections(archive: dict) -> dict:
+    """Snapshot sections for an archive: the index as JSON, each segment as raw bytes"""
+    sections = {"archive": {"index": archive["index"],
+                            "segments": {kind: len(segs) for kind, segs in archive["segments"].items()}}}
+    for kind, segments in archive["segments"].items():
+        for seg, blob in enumerate(segments):
+            sections[f"{ARCHIVE_SECTION}{kind}:{seg}"] = blob
+    return sections
+
+def load_archive(archive, source=None) -> dict:
+    """Archive saved by archive_sections(), with segments taken from source still
+    compressed. Also reads older saves that kept base64 segments inline or had
+    no positions in the index."""
+    archive = archive or empty_archive()
+    for kind, segments in archive["segments"].items():
+        if isinstance(segments, int):
+            names = [f"{ARCHIVE_SECTION}{kind}:{seg}" for seg in range(segments)]
+            archive["segments"][kind] = [source.raw(n) if source is not None and n in source else b"" for n in names]
+        else:
+            archive["segments"][kind] = [base64.b64decode(blob) for blob in segments]
+    counters = {}
+    for row in archive["index"]:
+        if len(row) < 6:
+            # Rows were appended in segment order, and restores removed item and row together
+            key = (row[0], row[1])
+            row.append(counters.get(key, 0))
+            counters[key] = row[5] + 1
+    return archive
+
+def is_cold(kind: str, item: dict, cutoff: date) -> bool:
+    """Whether an item belongs in the archive"""
+    item_date = item.get("Date")
+    if item.get("Unarchived"):
+        # Restored by hand; keep it in the working set
+        return False
+    if not isinstance(item_date, date) or item_date >= cutoff:
+        return False
+    if kind == "tasks":
+        return item.get("Status") == "Done"
+    return kind in ARCHIVE_KINDS
+
+def archive_label(item: dict) -> str:
+    return item.get("Title") or item.get("Summary") or item.get("Note", "")[:60]
+
+def read_segment(archive: dict, kind: str, seg: int) -> list:
+    blob = archive["segments"][kind][seg]
+    if not blob:
+        return []
+    return parse_dates(json.loads(zlib.decompress(blob).decode("utf-8")))
+
+def write_segment(archive: dict, kind: str, seg: int, items: list):
+    segments = archive["segments"].setdefault(kind, [])
+    live = any(x is not None for x in items)
+    blob = zlib.compress(json.dumps(items, default=default_serializer,
+                                    separators=(",", ":")).encode("utf-8"), 9) if live else b""
+    if seg == len(segments):
+        segments.append(blob)
+    else:
+        segments[seg] = blob
+
+def archive_items(archive: dict, kind: str, items: list):
+    """Append items to the archive as one new segment"""
+    seg = len(archive["segments"].get(kind, []))
+    write_segment(archive, kind, seg, items)
+    for pos, item in enumerate(items):
+        archive["index"].append([kind, seg, item.get("id"), str(item.get("Date", "")), archive_label(item), pos])
+
+def archive_cold_items(archive: dict, collections: dict, days: int, today: date, hydrate=None) -> int:
+    """Move cold items out of collections (kind -> list, edited in place).
+    hydrate(kind, item), if given, loads lazy fields before an item is archived.
+    Returns how many items were archived."""
+    if days <= 0:
+        return 0
+    cutoff = today - timedelta(days=days)
+    archived_ids = {row[2] for row in archive["index"]}
+    moved = 0
+    for kind in ARCHIVE_KINDS:
+        items = collections[kind]
+        cold = [x for x in items if is_cold(kind, x, cutoff)]
+        if not cold:
+            continue
+        fresh = [x for x in cold if x.get("id") not in archived_ids]
+        if hydrate:
+            for x in fresh:
+                hydrate(kind, x)
+        if fresh:
+            archive_items(archive, kind, fresh)
+        items[:] = [x for x in items if not is_cold(kind, x, cutoff)]
+        moved += len(fresh)
+    return moved
+
+def search_archive(archive: dict, query: str, limit: int = 50) -> list:
+    """Full-text search over archived items; segments are inflated one at a time.
+    Returns (kind, segment, position, item) tuples."""
+    query = query.strip().lower()
+    results = []
+    for kind, segments in archive["segments"].items():
+        for seg in range(len(segments)):
+            for pos, item in enumerate(read_segment(archive, kind, seg)):
+                if item is not None and any(query in str(v).lower() for k, v in item.items() if k != "id"):
+                    results.append((kind, seg, pos, item))
+                    if len(results) >= limit:
+                        return results
+    return results
+
+def restore_archived(archive: dict, kind: str, seg: int, pos: int):
+    """Remove the item at a segment position from the archive and return it,
+    or None if that slot is empty"""
+    row = next((r for r in archive["index"] if r[0] == kind and r[1] == seg and r[5] == pos), None)
+    items = read_segment(archive, kind, seg)
+    item = items[pos] if pos < len(items) else None
+    if item is None:
+        return None
+    items[pos] = None
+    write_segment(archive, kind, seg, items)
+    if row is not None:
+        archive["index"].remove(row)
+    return item
+
+# ------------------ History ------------------
+# Each version maps a collection name to the root of a persistent AVL tree
+# keyed by item id. Updates copy only the path to the changed node, so a new
+# version shares everything else with the previous one.
+HISTORY_LIMIT = 50
+HISTORY_KINDS = ("tasks", "activities", "habits", "notes")
+
+def _height(node):
+    return node[4] if node else 0
+
+def _node(key, value, left, right):
+    return (key, value, left, right, max(_height(left), _height(right)) + 1)
+
+def _rebalance(key, value, left, right):
+    if _height(left) > _height(right) + 1:
+        lk, lv, ll, lr, _ = left
+        if _height(ll) >= _height(lr):
+            return _node(lk, lv, ll, _node(key, value, lr, right))
+        rk, rv, rl, rr, _ = lr
+        return _node(rk, rv, _node(lk, lv, ll, rl), _node(key, value, rr, right))
+    if _height(right) > _height(left) + 1:
+        rk, rv, rl, rr, _ = right
+        if _height(rr) >= _height(rl):
+            return _node(rk, rv, _node(key, value, left, rl), rr)
+        lk, lv, ll, lr, _ = rl
+        return _node(lk, lv, _node(key, value, left, ll), _node(rk, rv, lr, rr))
+    return _node(key, value, left, right)
+
+def pmap_get(node, key):
+    while node:
+        if key == node[0]:
+            return node[1]
+        node = node[2] if key < node[0] else node[3]
+    return None
+
+def pmap_set(node, key, value):
+    """New tree with key set; shares all untouched subtrees with node"""
+    if not node:
+        return _node(key, value, None, None)
+    k, v, left, right, _ = node
+    if key == k:
+        return _node(k, value, left, right)
+    if key < k:
+        return _rebalance(k, v, pmap_set(left, key, value), right)
+    return _rebalance(k, v, left, pmap_set(right, key, value))
+
+def _pop_min(node):
+    k, v, left, right, _ = node
+    if not left:
+        return right, k, v
+    left, mk, mv = _pop_min(left)
+    return _rebalance(k, v, left, right), mk, mv
+
+def pmap_delete(node, key):
+    """New tree without key; shares all untouched subtrees with node"""
+    if not node:
+        return None
+    k, v, left, right, _ = node
+    if key < k:
+        return _rebalance(k, v, pmap_delete(left, key), right)
+    if key > k:
+        return _rebalance(k, v, left, pmap_delete(right, key))
+    if not right:
+        return left
+    right, mk, mv = _pop_min(right)
+    return _rebalance(mk, mv, left, right)
+
+def pmap_items(node):
+    """(key, value) pairs in key order"""
+    stack = []
+    while stack or node:
+        while node:
+            stack.append(node)
+            node = node[2]
+        node = stack.pop()
+        yield node[0], node[1]
+        node = node[3]
+
+def _archive_key(row) -> str:
+    return f"{row[0]}:{row[1]:06d}:{row[5]:06d}"
+
+class PlannerHistory:
+    """Bounded undo/redo history of the planner collections and the archive.
+
+    A version is (timestamp, label, {kind: tree root}, archive) where archive
+    holds a tree of index rows and tuples of the (immutable) segment blobs.
+    Recording diffs the live state against the current version and stores
+    copies of only the items and rows that changed.
+    """
+
+    def __init__(self, limit: int = HISTORY_LIMIT):
+        self.limit = limit
+        self.versions = []
+        self.cursor = -1
+
+    @staticmethod
+    def _diff(root, pairs, copy):
+        """New tree for (key, value) pairs; returns it with added/changed/removed counts"""
+        new, seen = root, set()
+        added = changed = 0
+        for key, value in pairs:
+            seen.add(key)
+            previous = pmap_get(root, key)
+            if previous != value:
+                new = pmap_set(new, key, copy(value))
+                if previous is None:
+                    added += 1
+                else:
+                    changed += 1
+        removed = [key for key, _ in pmap_items(root) if key not in seen]
+        for key in removed:
+            new = pmap_delete(new, key)
+        return new, added, changed, len(removed)
+
+    def record(self, collections: dict, archive: dict, now: datetime, amend: bool = False) -> bool:
+        """Add a version if collections or archive differ from the current one.
+        With amend the current version is updated in place instead, so the
+        change is not an undo step of its own (used for automatic archiving)."""
+        base = self.versions[self.cursor][2] if self.cursor >= 0 else {}
+        base_archive = self.versions[self.cursor][3] if self.cursor >= 0 else {"index": None, "segments": {}}
+        roots, changes = {}, []
+        for kind, items in collections.items():
+            roots[kind], added, changed, removed = self._diff(
+                base.get(kind), ((str(item.get("id")), item) for item in items), dict)
+            for count, verb in ((added, "added"), (changed, "edited"), (removed, "deleted")):
+                if count:
+                    changes.append(f"{count} {kind[:-1] if count == 1 else kind} {verb}")
+        
+        index, archived, _, restored = self._diff(
+            base_archive["index"], ((_archive_key(row), row) for row in archive["index"]), list)
+        segments = {kind: tuple(blobs) for kind, blobs in archive["segments"].items()}
+        for count, verb in ((archived, "archived"), (restored, "restored")):
+            if count:
+                changes.append(f"{count} {'item' if count == 1 else 'items'} {verb}")
+        if self.cursor >= 0 and not changes and segments == base_archive["segments"]:
+            return False
+        
+        state = {"index": index, "segments": segments}
+        if amend and self.cursor >= 0:
+            when, label, _, _ = self.versions[self.cursor]
+            self.versions[self.cursor] = (when, label, roots, state)
+            return True
+        
+        # A new change discards the redo branch
+        del self.versions[self.cursor + 1:]
+        self.versions.append((now, ", ".join(changes) or "Loaded", roots, state))
+        if len(self.versions) > self.limit:
+            del self.versions[:len(self.versions) - self.limit]
+        self.cursor = len(self.versions) - 1
+        return True
+
+    def can_undo(self) -> bool:
+        return self.cursor > 0
+
+    def can_redo(self) -> bool:
+        return self.cursor < len(self.versions) - 1
+
+    def undo(self) -> dict:
+        self.cursor -= 1
+        return self.materialize(self.cursor)
+
+    def redo(self) -> dict:
+        self.cursor += 1
+        return self.materialize(self.cursor)
+
+    def materialize(self, pos: int):
+        """Plain lists of the collections and a plain archive at a version"""
+        _, _, roots, state = self.versions[pos]
+        collections = {kind: [dict(value) for _, value in pmap_items(root)] for kind, root in roots.items()}
+        archive = {"segments": {kind: list(blobs) for kind, blobs in state["segments"].items()},
+                   "index": [list(row) for _, row in pmap_items(state["index"])]}
+        return collections, archive
+
+    def as_of(self, when: datetime):
+        """Position of the last version recorded at or before when, or None"""
+        pos = bisect.bisect_right([v[0] for v in self.versions], when) - 1
+        return pos if pos >= 0 else None
+
+# ------------------ Item IDs ------------------
+# Ids are "<prefix>-" followed by 12 hex digits of epoch milliseconds, 4 of a
+# per-millisecond sequence and 4 random ones. They sort by creation time, so
+# collections are kept in id order: new items are appended, and lookups and
+# creation-time range scans use binary search instead of sorting.
+# 13 decimal digits of epoch ms, with a "-<n>" suffix on some imported duplicates
+LEGACY_ID = re.compile(r"^([a-z]+)-(\d{13})(?:-\d+)?$")
+
+class IdClock:
+    """Monotonic (millisecond, sequence) source shared by every session"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_ms = 0
+        self.seq = 0
+
+    def tick(self, now_ms: int):
+        with self.lock:
+            if now_ms > self.last_ms:
+                self.last_ms, self.seq = now_ms, 0
+            else:
+                # Same millisecond, or the wall clock went backwards
+                self.seq += 1
+                if self.seq > 0xFFFF:
+                    self.last_ms, self.seq = self.last_ms + 1, 0
+            return self.last_ms, self.seq
+
+@st.cache_resource
+def get_id_clock() -> IdClock:
+    return IdClock()
+
+def gen_id(prefix: str) -> str:
+    ms, seq = get_id_clock().tick(int(time.time() * 1000))
+    return f"{prefix}-{ms:012x}{seq:04x}{secrets.randbits(16):04x}"
+
+def id_floor(prefix: str, when: datetime) -> str:
+    """Smallest id that could have been created at or after when"""
+    return f"{prefix}-{int(when.timestamp() * 1000):012x}"
+
+def find_index(items: list, item_id):
+    """Position of the item with item_id, or None"""
+    i = bisect.bisect_left(items, item_id, key=lambda x: x["id"])
+    if i < len(items) and items[i]["id"] == item_id:
+        return i
+    # Not in id order (e.g. hand-edited data); fall back to a scan
+    return next((i for i, x in enumerate(items) if x["id"] == item_id), None)
+
+def find_item(items: list, item_id):
+    i = find_index(items, item_id)
+    return items[i] if i is not None else None
+
+def insert_by_id(items: list, item: dict):
+    """Insert keeping id order; an append for anything newly created"""
+    bisect.insort(items, item, key=lambda x: x["id"])
+
+def created_between(items: list, prefix: str, start: datetime, end: datetime) -> list:
+    """Items created in [start, end), found by binary search on their ids"""
+    key = lambda x: x["id"]
+    lo = bisect.bisect_left(items, id_floor(prefix, start), key=key)
+    hi = bisect.bisect_left(items, id_floor(prefix, end), key=key)
+    return items[lo:hi]
+
+def migrate_ids(items: list, taken: set, hydrate_item=None, sort: bool = True) -> list:
+    """Rewrite legacy "<prefix>-<epoch ms>" ids in place and, if sort, put items in id order.
+    Items that shared a millisecond get distinct sequence numbers; taken holds the
+    ids already in use and is updated. The result is deterministic, so migrating
+    the same data again gives the same ids. hydrate_item is called before an
+    item's id changes. Returns (old id, item) pairs, as old ids may repeat."""
+    renamed = []
+    for item in items:
+        match = LEGACY_ID.match(str(item.get("id", "")))
+        if not match:
+            continue
+        prefix, ms = match.group(1), int(match.group(2))
+        seq = 0
+        new_id = f"{prefix}-{ms:012x}{seq:04x}0000"
+        while new_id in taken:
+            seq += 1
+            new_id = f"{prefix}-{ms:012x}{seq:04x}0000"
+        taken.add(new_id)
+        if hydrate_item:
+            hydrate_item(item)
+        renamed.append((item["id"], item))
+        item["id"] = new_id
+    if sort and any(items[i]["id"] > items[i + 1]["id"] for i in range(len(items) - 1)):
+        items.sort(key=lambda x: x["id"])
+    return renamed
+
+def migrate_archive_ids(archive: dict, taken: set) -> list:
+    """migrate_ids() for archived items. Segments holding legacy ids are rewritten
+    with every item left at its position, and their index rows are replaced."""
+    stale = sorted({(row[0], row[1]) for row in archive["index"] if LEGACY_ID.match(str(row[2]))})
+    renamed, new_ids = [], {}
+    for kind, seg in stale:
+        items = read_segment(archive, kind, seg)
+        renamed += migrate_ids([x for x in items if x is not None], taken, sort=False)
+        write_segment(archive, kind, seg, items)
+        for pos, item in enumerate(items):
+            if item is not None:
+                new_ids[(kind, seg, pos)] = item.get("id")
+    if stale:
+        archive["index"] = [[row[0], row[1], new_ids.get((row[0], row[1], row[5]), row[2]), *row[3:]]
+                            for row in archive["index"]]
+    return renamed
+
+# ------------------ Local API ------------------
+# A small asyncio HTTP/JSON server on localhost. Sessions publish their lists
+# to a shared ApiStore when they save, and pull from it on the next run when
+# the API (or another session) has changed something. The last writer wins.
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 5000
+API_MAX_BODY_BYTES = 32 * 1024 * 1024
+API_PREFIXES = {"tasks": "task", "activities": "activity", "habits": "habit", "notes": "note"}
+API_REQUIRED = {"tasks": ("Title", "Date"), "activities": ("Title", "Date", "Time"), "habits": ("Habit",), "notes": ("Note", "Date")}
+API_DEFAULTS = {
+    "tasks": {"Time": "09:00:00", "Priority": "Medium", "Status": "Pending", "ReminderMinutes": 0},
+    "activities": {"Duration": 60},
+    "habits": {"Frequency": "Daily"},
+    "notes": {},
+}
+# Same limits and choices as the app's forms
+API_TEXT_FIELDS = ("Title", "Habit", "Note", "Summary")
+API_RANGES = {"Duration": (1, 1440), "ReminderMinutes": (0, 1440)}
+API_CHOICES = {
+    "Priority": ("Low", "Medium", "High"),
+    "Status": ("Pending", "Notified", "Done"),
+    "Frequency": ("Daily", "Weekly", "Monthly"),
+}
+HTTP_REASONS = {200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request", 403: "Forbidden",
+                404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 415: "Unsupported Media Type"}
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def api_item(kind: str, data, item_id: str) -> dict:
+    """Validate an incoming item and convert its dates and times"""
+    if not isinstance(data, dict):
+        raise ApiError(400, f"{kind[:-1]} must be a JSON object")
+    item = {"id": item_id, **API_DEFAULTS[kind], **{k: v for k, v in data.items() if k != "id"}}
+    missing = [f for f in API_REQUIRED[kind] if item.get(f) in (None, "")]
+    if missing:
+        raise ApiError(400, f"missing {', '.join(missing)}")
+    if kind == "notes" and "Note" in data:
+        item.pop("Summary", None)  # recomputed from the new text when shown
+    parse_dates(item)
+    if "Date" in item and not isinstance(item["Date"], date):
+        raise ApiError(400, "Date must be YYYY-MM-DD")
+    if "Time" in item and not isinstance(item["Time"], dtime):
+        raise ApiError(400, "Time must be HH:MM:SS")
+    for field in API_TEXT_FIELDS:
+        if field in item and not isinstance(item[field], str):
+            raise ApiError(400, f"{field} must be a string")
+    if item.get("CompletedAt") is not None:
+        # Stored the way the Tasks page writes it, so analytics can parse it
+        try:
+            completed = datetime.fromisoformat(str(item["CompletedAt"]))
+        except ValueError:
+            raise ApiError(400, "CompletedAt must be an ISO date and time")
+        if completed.tzinfo is not None:
+            completed = completed.astimezone().replace(tzinfo=None)
+        item["CompletedAt"] = completed.isoformat(timespec="minutes")
+    for field, (low, high) in API_RANGES.items():
+        value = item.get(field)
+        if field in item and (not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high):
+            raise ApiError(400, f"{field} must be an integer from {low} to {high}")
+    for field, choices in API_CHOICES.items():
+        if field in item and item[field] not in choices:
+            raise ApiError(400, f"{field} must be {', '.join(choices[:-1])} or {choices[-1]}")
+    return item
+
+class ApiStore:
+    """Planner collections shared by every session and the API thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.collections = {kind: [] for kind in API_PREFIXES}
+        self.versions = {kind: 0 for kind in API_PREFIXES}
+        self.revision = 0
+        self.token = f"{int(time.time()):x}"  # keeps ETags from matching across restarts
+
+    def publish(self, collections: dict) -> int:
+        """Replace the shared lists with a session's lists"""
+        with self.lock:
+            for kind, items in collections.items():
+                if self.collections[kind] != items:
+                    self.collections[kind] = [dict(x) for x in items]
+                    self._touch(kind)
+            return self.revision
+
+    def snapshot(self):
+        """(revision, copies of the shared lists)"""
+        with self.lock:
+            return self.revision, {kind: [dict(x) for x in items] for kind, items in self.collections.items()}
+
+    def _touch(self, kind: str):
+        self.versions[kind] += 1
+        self.revision += 1
+
+    def _etag(self, kind: str, *parts) -> str:
+        return 'W/"' + "-".join(str(p) for p in (self.token, kind, self.versions[kind]) + parts) + '"'
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body):
+        """Serve one request; returns (status, payload, extra headers)"""
+        parts = [p for p in path.split("/") if p]
+        if not parts or parts[0] != "api":
+            raise ApiError(404, "not found")
+        with self.lock:
+            if len(parts) == 1:
+                return 200, {kind: len(items) for kind, items in self.collections.items()}, {}
+            kind = parts[1]
+            if kind not in self.collections:
+                raise ApiError(404, f"unknown collection {kind}")
+            items = self.collections[kind]
+            
+            if len(parts) == 2:
+                if method == "GET":
+                    try:
+                        offset = max(int(query.get("offset", 0)), 0)
+                        limit = min(max(int(query.get("limit", API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+                    except ValueError:
+                        raise ApiError(400, "offset and limit must be integers")
+                    etag = self._etag(kind, offset, limit)
+                    if etag in headers.get("if-none-match", ""):
+                        return 304, None, {"ETag": etag}
+                    page = items[offset:offset + limit]
+                    more = offset + limit < len(items)
+                    return 200, {"items": page, "offset": offset, "limit": limit, "total": len(items),
+                                 "next": offset + limit if more else None}, {"ETag": etag}
+                if method == "POST":
+                    # A single object or a list of them
+                    batch = body if isinstance(body, list) else [body]
+                    # New ids sort after existing ones, so this keeps id order
+                    created = [api_item(kind, data, gen_id(API_PREFIXES[kind])) for data in batch]
+                    items.extend(created)
+                    self._touch(kind)
+                    return 201, {"items": created}, {"ETag": self._etag(kind)}
+                raise ApiError(405, "use GET or POST")
+            
+            if parts[2] == "batch" and len(parts) == 3:
+                # {"create": [...], "update": [{id, ...}], "delete": [ids]}, applied all or nothing
+                if method != "POST" or not isinstance(body, dict):
+                    raise ApiError(400, "POST a JSON object with create, update and delete lists")
+                for field, element, name in (("create", dict, "objects"), ("update", dict, "objects"), ("delete", str, "ids")):
+                    value = body.get(field, [])
+                    if not isinstance(value, list) or not all(isinstance(x, element) for x in value):
+                        raise ApiError(400, f"{field} must be a list of {name}")
+                if not all(isinstance(data.get("id"), str) for data in body.get("update", [])):
+                    raise ApiError(400, "every update needs a string id")
+                by_id = {x["id"]: i for i, x in enumerate(items)}
+                created = [api_item(kind, data, gen_id(API_PREFIXES[kind])) for data in body.get("create", [])]
+                updated = []
+                for data in body.get("update", []):
+                    if data.get("id") not in by_id:
+                        raise ApiError(404, f"no {kind[:-1]} {data.get('id')}")
+                    updated.append(api_item(kind, {**items[by_id[data["id"]]], **data}, data["id"]))
+                deleted = set(body.get("delete", []))
+                for item in updated:
+                    items[by_id[item["id"]]] = item
+                items[:] = [x for x in items if x["id"] not in deleted] + created
+                self._touch(kind)
+                return 200, {"created": created, "updated": updated, "deleted": sorted(deleted & set(by_id))}, {"ETag": self._etag(kind)}
+            
+            if len(parts) != 3:
+                raise ApiError(404, "not found")
+            item_id = parts[2]
+            index = find_index(items, item_id)
+            if index is None:
+                raise ApiError(404, f"no {kind[:-1]} {item_id}")
+            if method == "GET":
+                etag = self._etag(kind, item_id)
+                if etag in headers.get("if-none-match", ""):
+                    return 304, None, {"ETag": etag}
+                return 200, items[index], {"ETag": etag}
+            if method in ("PUT", "PATCH"):
+                merged = {**items[index], **body} if method == "PATCH" and isinstance(body, dict) else body
+                items[index] = api_item(kind, merged, item_id)
+                self._touch(kind)
+                return 200, items[index], {"ETag": self._etag(kind, item_id)}
+            if method == "DELETE":
+                del items[index]
+                self._touch(kind)
+                return 200, {"deleted": [item_id]}, {}
+            raise ApiError(405, "use GET, PUT, PATCH or DELETE")
+
+class ApiServer:
+    """Runs the API on an asyncio event loop in a daemon thread"""
+
+    def __init__(self, store: ApiStore, host: str = API_HOST, port: int = API_PORT):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.error = None
+        self._loop = None
+        self._thread = None
+        self._users = set()
+        self._users_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        ready = threading.Event()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True, name="planner-api")
+        self._thread.start()
+        ready.wait(5)
+
+    def acquire(self, user: str):
+        """Start the server (if needed) on behalf of one session"""
+        with self._users_lock:
+            self._users.add(user)
+            self.start()
+
+    def release(self, user: str):
+        """Drop one session's claim; the server stops once no session has one"""
+        with self._users_lock:
+            if user not in self._users:
+                return False
+            self._users.discard(user)
+            if not self._users:
+                self.stop()
+            return True
+
+    def stop(self):
+        if self.running:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+    def _run(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        try:
+            server = self._loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+        except OSError as e:
+            self.error = str(e)
+            ready.set()
+            return
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            # Keep-alive connections still have handlers waiting on them
+            handlers = asyncio.all_tasks(self._loop)
+            for task in handlers:
+                task.cancel()
+            if handlers:
+                self._loop.run_until_complete(asyncio.gather(*handlers, return_exceptions=True))
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                request = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                # Without a usable request line or length the next request can't be
+                # found, so those errors close the connection after the reply
+                framed = False
+                try:
+                    if len(request) != 3:
+                        raise ApiError(400, "malformed request line")
+                    method, target, _ = request
+                    try:
+                        url = urllib.parse.urlsplit(target)
+                        query = dict(urllib.parse.parse_qsl(url.query))
+                        length = int(headers.get("content-length", 0) or 0)
+                    except ValueError:
+                        raise ApiError(400, "malformed request target or Content-Length")
+                    if length < 0:
+                        raise ApiError(400, "malformed request target or Content-Length")
+                    if length > API_MAX_BODY_BYTES:
+                        raise ApiError(413, "request body too large")
+                    raw = await reader.readexactly(length) if length else b""
+                    framed = True
+                    # Web pages can reach localhost too: a rebound DNS name shows up in Host,
+                    # and JSON bodies can't be sent cross-origin without a preflight
+                    if headers.get("host") not in (f"{self.host}:{self.port}", f"localhost:{self.port}"):
+                        raise ApiError(403, "requests must be addressed to this host")
+                    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                    if (raw or method.upper() in ("POST", "PUT", "PATCH")) and content_type != "application/json":
+                        raise ApiError(415, "send request bodies as application/json")
+                    try:
+                        body = json.loads(raw) if raw else None
+                    except ValueError:
+                        raise ApiError(400, "body is not valid JSON")
+                    status, payload, extra = self.store.handle(method.upper(), url.path, query, headers, body)
+                except ApiError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, {}
+                
+                data = b"" if payload is None else json.dumps(payload, default=default_serializer).encode("utf-8")
+                head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                        "Content-Type: application/json; charset=utf-8", f"Content-Length: {len(data)}"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close" or not framed:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down; end quietly so asyncio doesn't log the
+            # connection as failed
+            pass
+        finally:
+            writer.close()
+
+@st.cache_resource
+def get_api_server() -> ApiServer:
+    """One server and store per process, shared by all sessions"""
+    return ApiServer(ApiStore())
+
 # ------------------ Local Storage Functions ------------------
+# Notes are saved as metadata (id, date, summary) in the "notes" section and
+# one "note:<id>" section per body, so bodies are only inflated when opened.
+NOTE_SECTION = "note:"
+
+# Loaded bodies are cached by id rather than written into the note, so loading
+# one is not an edit as far as history and saving are concerned.
+
+def note_body(note: dict) -> str:
+    """Full text of a note, loaded from the saved snapshot on first use"""
+    if "Note" in note:
+        return note["Note"]
+    bodies = st.session_state.setdefault("note_bodies", {})
+    note_id = str(note.get("id"))
+    if note_id not in bodies:
+        source = st.session_state.get("note_source")
+        bodies[note_id] = source.get(NOTE_SECTION + note_id, "", cache=False) if source is not None else ""
+    return bodies[note_id]
+
+def hydrate(kind: str, item: dict) -> dict:
+    """Copy lazily stored fields into the item itself, for when it is about to
+    leave the working set or change id"""
+    if kind == "notes":
+        item["Note"] = note_body(item)
+    return item
+
+def note_metadata(note: dict) -> dict:
+    """What is saved eagerly for a note: everything but the body, plus any cached summary"""
+    meta = {k: v for k, v in note.items() if k != "Note"}
+    summary = st.session_state.get("note_summaries", {}).get(str(note.get("id")))
+    if "Summary" not in meta and summary is not None:
+        meta["Summary"] = summary
+    return meta
+
 def save_to_local_storage():
-    """Save all data to browser's local storage"""
+    """Save all data to browser's local storage as a chunked snapshot"""
     import streamlit.components.v1 as components
     
+    # Every change goes through here, so this is where versions are recorded
+    if "history" in st.session_state:
+        st.session_state.history.record({kind: st.session_state[kind] for kind in HISTORY_KINDS},
+                                        st.session_state.archive, datetime.now())
+    
     data = {
         "tasks": st.session_state.tasks,
         "activities": st.session_state.activities,
         "habits": st.session_state.habits,
-        "notes": st.session_state.notes,
+        "notes": [note_metadata(n) for n in st.session_state.notes],
         "theme": st.session_state.theme,
         "settings": {
             "desktop_notify": st.session_state.desktop_notify,
             "auto_refresh": st.session_state.auto_refresh,
             "auto_refresh_secs": st.session_state.auto_refresh_secs,
-            "bg_notify_enabled": st.session_state.bg_notify_enabled
-        }
+            "bg_notify_enabled": st.session_state.bg_notify_enabled,
+            "archive_after_days": st.session_state.archive_after_days,
+            "api_enabled": st.session_state.api_enabled
+        },
+        "notified": st.session_state.notified,
+        **archive_sections(st.session_state.archive)
     }
     
-    # Convert to JSON string, handling date objects
-    def default_serializer(obj):
-        if isinstance(obj, (date, datetime)):
-            return obj.isoformat()
-        elif isinstance(obj, dtime):
-            return obj.strftime('%H:%M:%S')
-        raise TypeError(f"Type {type(obj)} not serializable")
+    # Bodies that were never opened are copied over still compressed
+    source = st.session_state.get("note_source")
+    for n in st.session_state.notes:
+        key = NOTE_SECTION + str(n.get("id"))
+        if "Note" in n:
+            data[key] = n["Note"]
+        elif source is not None and key in source:
+            data[key] = source.raw(key)
+    
+    # Share the change with the local API; it serves full notes, so bodies are loaded
+    if st.session_state.api_enabled:
+        collections = {kind: st.session_state[kind] for kind in API_PREFIXES}
+        collections["notes"] = [{**n, "Note": note_body(n)} for n in st.session_state.notes]
+        st.session_state.api_revision = get_api_server().store.publish(collections)
     
-    data_str = json.dumps(data, default=default_serializer)
+    chunks = split_snapshot(encode_snapshot(data))
+    usage = snapshot_usage(chunks)
+    if usage > STORAGE_QUOTA_BYTES:
+        # Leave the previous snapshot in place rather than half-overwrite it
+        st.error(f"Data is too large for browser storage ({usage / 1024 / 1024:.1f} MB). Not saved.")
+        return False
+    # Until the manifest is switched both snapshots are stored. When they can't
+    # fit together the old one (and its manifest) is removed first, so a failed
+    # write leaves nothing to load rather than a half-written snapshot.
+    in_place = st.session_state.storage_usage + usage > STORAGE_QUOTA_BYTES
+    st.session_state.storage_usage = usage
     
-    # Save to local storage
+    # Chunks are written under a fresh generation and the manifest is switched
+    # last, so a quota error mid-write never corrupts the previous snapshot.
+    # Failures are reported back through the "save_error" query parameter.
     components.html(
         f"""
         <script>
-        localStorage.setItem('daily_planner_data', `{data_str}`);
-        console.log('Data saved to local storage');
+        (function() {{
+            const key = {json.dumps(STORAGE_KEY)};
+            const chunks = {json.dumps(chunks)};
+            let old = null;
+            try {{ old = JSON.parse(localStorage.getItem(key)); }} catch (e) {{}}
+            const oldGen = (old && old.v) ? old.gen : null;
+            const gen = oldGen === 0 ? 1 : 0;
+            try {{
+                if ({json.dumps(in_place)} && oldGen !== null) {{
+                    localStorage.removeItem(key);
+                    for (let i = 0; i < old.chunks; i++) localStorage.removeItem(key + "." + oldGen + "." + i);
+                }}
+                chunks.forEach((c, i) => localStorage.setItem(key + "." + gen + "." + i, c));
+                localStorage.setItem(key, JSON.stringify({{v: {SNAPSHOT_VERSION}, gen: gen, chunks: chunks.length}}));
+            }} catch (e) {{
+                chunks.forEach((c, i) => localStorage.removeItem(key + "." + gen + "." + i));
+                console.error('Saving to local storage failed', e);
+                const url = new URL(window.parent.location);
+                url.searchParams.set('save_error', e.name || String(e));
+                window.parent.history.replaceState({{}}, '', url);
+                return;
+            }}
+            if (oldGen !== null) {{
+                for (let i = 0; i < old.chunks; i++) localStorage.removeItem(key + "." + oldGen + "." + i);
+            }}
+            console.log('Data saved to local storage');
+        }})();
         </script>
         """,
         height=0,
     )
+    return True
 
 def load_from_local_storage():
     """Load data from browser's local storage"""
@@ -86,14 +1038,24 @@ def load_from_local_storage():
     
     # First, get data from local storage via JavaScript
     components.html(
-        """
+        f"""
         <script>
-        const data = localStorage.getItem('daily_planner_data');
-        if (data) {
+        const key = {json.dumps(STORAGE_KEY)};
+        let data = localStorage.getItem(key);
+        try {{
+            const manifest = JSON.parse(data);
+            if (manifest && manifest.v) {{
+                // Reassemble a chunked snapshot
+                const parts = [];
+                for (let i = 0; i < manifest.chunks; i++) parts.push(localStorage.getItem(key + "." + manifest.gen + "." + i) || "");
+                data = parts.join("");
+            }}
+        }} catch (e) {{}}
+        if (data) {{
             // Store data in window for retrieval
             window.localStorageData = data;
             console.log('Data loaded from local storage');
-        }
+        }}
         </script>
         """,
         height=0,
@@ -120,32 +1082,16 @@ def load_from_local_storage():
                 height=0,
             )
             return None
-            
-        data = json.loads(data_str)
         
-        # Convert string dates back to date objects
-        def parse_dates(obj):
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    if key == "Date" and isinstance(value, str):
-                        try:
-                            obj[key] = datetime.fromisoformat(value).date()
-                        except:
-                            pass
-                    elif key == "Time" and isinstance(value, str):
-                        try:
-                            obj[key] = datetime.strptime(value, '%H:%M:%S').time()
-                        except:
-                            pass
-                    elif isinstance(value, (dict, list)):
-                        parse_dates(value)
-            elif isinstance(obj, list):
-                for item in obj:
-                    parse_dates(item)
-            return obj
+        # What is stored now, for the next save's quota check
+        st.session_state.storage_usage = snapshot_usage(split_snapshot(data_str))
         
-        data = parse_dates(data)
-        return data
+        # Older versions stored plain JSON
+        if data_str.lstrip().startswith("{"):
+            return parse_dates(json.loads(data_str))
+        
+        # Sections are only decompressed when first read
+        return LazySnapshot(data_str, transform=parse_dates)
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
@@ -168,6 +1114,11 @@ if saved_data:
     ss.auto_refresh = settings.get("auto_refresh", False)
     ss.auto_refresh_secs = settings.get("auto_refresh_secs", 30)
     ss.bg_notify_enabled = settings.get("bg_notify_enabled", False)
+    ss.archive_after_days = settings.get("archive_after_days", ARCHIVE_AFTER_DAYS)
+    ss.api_enabled = settings.get("api_enabled", False)
+    ss.notified = saved_data.get("notified", {})
+    ss.archive = load_archive(saved_data.get("archive"), saved_data if isinstance(saved_data, LazySnapshot) else None)
+    ss.note_source = saved_data if isinstance(saved_data, LazySnapshot) else None
 else:
     # Default values if no saved data
     ss.setdefault("tasks", [])
@@ -179,6 +1130,11 @@ else:
     ss.setdefault("auto_refresh", False)
     ss.setdefault("auto_refresh_secs", 30)
     ss.setdefault("bg_notify_enabled", False)
+    ss.setdefault("archive_after_days", ARCHIVE_AFTER_DAYS)
+    ss.setdefault("api_enabled", False)
+    ss.setdefault("notified", {})
+    ss.setdefault("archive", empty_archive())
+    ss.setdefault("note_source", None)
 
 # These can remain as they're not critical to persist
 ss.setdefault("selected_date", date.today())
@@ -188,14 +1144,58 @@ ss.setdefault("editing_type", None)
 ss.setdefault("search_date", None)
 ss.setdefault("editing_id", None)
 ss.setdefault("editing_item_type", None)
-ss.setdefault("notified_items", set())
+ss.setdefault("notify_pending", [])
+ss.setdefault("notify_last_sent", None)
 ss.setdefault("notify_trigger", 0)
 ss.setdefault("summarizer_text", "")
 ss.setdefault("summarizer_result", "")
+ss.setdefault("summarizer_error", "")
+ss.setdefault("summarizer_job", None)
+ss.setdefault("storage_usage", 0)
+
+# A failed browser write is reported back on the next run
+if "save_error" in st.query_params:
+    st.error(f"Saving to browser storage failed ({st.query_params['save_error']}). "
+             "Recent changes are only kept until the page is reloaded.")
+    del st.query_params["save_error"]
+ss.setdefault("api_revision", None)
+ss.setdefault("api_session", secrets.token_hex(8))  # this session's claim on the shared API server
+
+# Move old "<prefix>-<epoch ms>" ids to the sortable scheme, archive included
+taken = {x["id"] for kind in HISTORY_KINDS for x in ss[kind]} | {row[2] for row in ss.archive["index"]}
+renamed = []
+for kind in HISTORY_KINDS:
+    renamed += migrate_ids(ss[kind], taken, lambda item, kind=kind: hydrate(kind, item))
+renamed += migrate_archive_ids(ss.archive, taken)
+if renamed:
+    for key in list(ss.notified):
+        item_id, at, when = key.partition("@")
+        candidates = [item for old_id, item in renamed if old_id == item_id]
+        if not candidates:
+            continue
+        # Duplicates shared the old id; the reminder's time tells them apart
+        item = next((x for x in candidates if isinstance(x.get("Date"), date) and isinstance(x.get("Time"), dtime)
+                     and f"{x['Date']}T{x['Time'].strftime('%H:%M')}" == when), candidates[0])
+        ss.notified[item["id"] + at + when] = ss.notified.pop(key)
+    save_to_local_storage()
+
+ss.setdefault("history", PlannerHistory())
+ss.history.record({kind: ss[kind] for kind in HISTORY_KINDS}, ss.archive, datetime.now())
+
+# Keep the working lists small by archiving completed and past items
+archived_now = archive_cold_items(ss.archive, {"tasks": ss.tasks, "activities": ss.activities, "notes": ss.notes},
+                                  int(ss.archive_after_days), date.today(), hydrate)
+# Folded into the current version: undoing it would only be redone on the next run
+ss.history.record({kind: ss[kind] for kind in HISTORY_KINDS}, ss.archive, datetime.now(), amend=True)
+if archived_now:
+    save_to_local_storage()
 
 # ------------------ Unified Text Summarization Function ------------------
-def summarize_any_text(text: str, max_sentences: int = 3, max_length: int = 300) -> str:
-    """Unified text summarizer that works for any type of content"""
+SUMMARY_PROGRESS_STEP = 200  # sentences scored between progress reports
+
+def summarize_any_text(text: str, max_sentences: int = 3, max_length: int = 300, progress=None) -> str:
+    """Unified text summarizer that works for any type of content.
+    progress, if given, is called with the fraction of work done."""
     text = text.strip()
     if not text:
         return ""
@@ -222,6 +1222,8 @@ def summarize_any_text(text: str, max_sentences: int = 3, max_length: int = 300)
     # Score sentences based on importance
     scored_sentences = []
     for i, sentence in enumerate(sentences):
+        if progress and i % SUMMARY_PROGRESS_STEP == 0:
+            progress(i / len(sentences))
         score = 0
         
         # Score based on keywords
@@ -274,9 +1276,48 @@ def summarize_any_text(text: str, max_sentences: int = 3, max_length: int = 300)
     
     return result
 
+# ------------------ Background Summaries ------------------
+SUMMARY_WORKERS = 4
+
+@st.cache_resource
+def get_summary_pool():
+    """Worker pool shared by every session.
+    Threads rather than processes: functions defined in a Streamlit script can't be pickled."""
+    return ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summarizer")
+
+class SummaryJob:
+    """A summary running in the shared pool, with progress and cooperative cancellation"""
+
+    def __init__(self):
+        self.progress = 0.0
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def report(self, fraction: float):
+        """Progress callback for summarize_any_text; stops the work once cancelled"""
+        if self.cancelled.is_set():
+            raise CancelledError()
+        self.progress = fraction
+
+    def cancel(self):
+        self.cancelled.set()
+        self.future.cancel()
+
+def submit_summary(text: str, max_sentences: int, max_length: int) -> SummaryJob:
+    job = SummaryJob()
+    job.future = get_summary_pool().submit(summarize_any_text, text, max_sentences, max_length, job.report)
+    return job
+
 # ------------------ Helpers ------------------
-def gen_id(prefix: str) -> str:
-    return f"{prefix}-{int(datetime.now().timestamp()*1000)}"
+def note_summary(note: dict) -> str:
+    """Precomputed summary of a note; older notes get one (cached by id) the first time they're shown"""
+    if "Summary" in note:
+        return note["Summary"]
+    summaries = ss.setdefault("note_summaries", {})
+    note_id = str(note.get("id"))
+    if note_id not in summaries:
+        summaries[note_id] = summarize_any_text(note_body(note))
+    return summaries[note_id]
 
 def due_soon(item: dict) -> bool:
     try:
@@ -334,7 +1375,7 @@ def edit_form(item_type, item):
         )
         
     elif item_type == "note":
-        edited_item["Note"] = st.text_area("Note", value=item.get("Note", ""), key="edit_note")
+        edited_item["Note"] = st.text_area("Note", value=note_body(item), key="edit_note")
         edited_item["Date"] = st.date_input("Date", value=item.get("Date", date.today()), key="edit_date")
 
     col1, col2 = st.columns(2)
@@ -347,16 +1388,190 @@ def edit_form(item_type, item):
             
     return None
 
-# ------------------ Notifications ------------------
-def notify(title: str, body: str, item_id=None):
-    # Skip if already notified
-    if item_id and item_id in ss.notified_items:
-        return
+# ------------------ Schedule Index ------------------
+TASK_BLOCK_MINUTES = 30     # time a task is assumed to take; tasks have no Duration
+MAX_DURATION_MINUTES = 1440  # matches the Duration input limit
+
+def item_interval(item: dict):
+    """Start and end datetime of a timed item"""
+    start = datetime.combine(item["Date"], item["Time"])
+    return start, start + timedelta(minutes=int(item.get("Duration", TASK_BLOCK_MINUTES) or TASK_BLOCK_MINUTES))
+
+def scheduled_items(activities, tasks):
+    """Activities plus tasks that still need doing, i.e. everything that occupies time"""
+    return list(activities) + [t for t in tasks if t.get("Status") != "Done"]
+
+class ScheduleIndex:
+    """Sorted interval index over timed items.
+
+    Entries are kept sorted by start, so overlap lookups only scan the items
+    that can reach the queried range (durations are bounded). Busy time is
+    merged into disjoint blocks, and a max segment tree over the gaps between
+    blocks finds the first gap of a given length in O(log n).
+    """
+
+    def __init__(self, items):
+        entries = []
+        for item in items:
+            try:
+                start, end = item_interval(item)
+            except (KeyError, TypeError, ValueError):
+                continue
+            entries.append((start, end, item))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.entries = entries
+        self.starts = [e[0] for e in entries]
+        self.max_span = max((e[1] - e[0] for e in entries), default=timedelta(0))
         
-    # Store notification to prevent duplicates
-    if item_id:
-        ss.notified_items.add(item_id)
-    
+        # Merge into disjoint busy blocks
+        self.busy_starts, self.busy_ends = [], []
+        for start, end, _ in entries:
+            if self.busy_ends and start <= self.busy_ends[-1]:
+                self.busy_ends[-1] = max(self.busy_ends[-1], end)
+            else:
+                self.busy_starts.append(start)
+                self.busy_ends.append(end)
+        
+        # gaps[i] is the free time (minutes) between block i and block i+1
+        gaps = [(self.busy_starts[i + 1] - self.busy_ends[i]).total_seconds() / 60
+                for i in range(len(self.busy_starts) - 1)]
+        self._size = 1
+        while self._size < len(gaps):
+            self._size *= 2
+        self._gap_count = len(gaps)
+        self._tree = [0.0] * (2 * self._size)
+        self._tree[self._size:self._size + len(gaps)] = gaps
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def overlapping(self, start: datetime, end: datetime, exclude_id=None) -> list:
+        """Items whose interval overlaps [start, end)"""
+        lo = bisect.bisect_left(self.starts, start - self.max_span)
+        hi = bisect.bisect_left(self.starts, end)
+        return [item for s, e, item in self.entries[lo:hi]
+                if e > start and s < end and (exclude_id is None or item.get("id") != exclude_id)]
+
+    def conflicts(self) -> dict:
+        """Sweep line over all entries; maps item id to the titles it overlaps"""
+        clashes = {}
+        active = []  # heap of (end, position) for intervals still open
+        for pos, (start, end, item) in enumerate(self.entries):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, other_pos in active:
+                other = self.entries[other_pos][2]
+                clashes.setdefault(item.get("id"), []).append(other.get("Title", ""))
+                clashes.setdefault(other.get("id"), []).append(item.get("Title", ""))
+            heapq.heappush(active, (end, pos))
+        return clashes
+
+    def _first_gap(self, lo: int, minutes: float, node: int = 1, left: int = 0, right=None):
+        """Index of the first gap at or after lo that is at least minutes long"""
+        if right is None:
+            right = self._size - 1
+        if right < lo or left >= self._gap_count or self._tree[node] < minutes:
+            return None
+        if left == right:
+            return left
+        mid = (left + right) // 2
+        found = self._first_gap(lo, minutes, 2 * node, left, mid)
+        if found is None:
+            found = self._first_gap(lo, minutes, 2 * node + 1, mid + 1, right)
+        return found
+
+    def free_slot(self, minutes: int, window_start: datetime, window_end: datetime):
+        """Start of the earliest free slot of the given length inside the window, or None"""
+        length = timedelta(minutes=minutes)
+        i = bisect.bisect_right(self.busy_ends, window_start)
+        if i == len(self.busy_starts):
+            return window_start if window_start + length <= window_end else None
+        if self.busy_starts[i] > window_start:
+            if min(self.busy_starts[i], window_end) - window_start >= length:
+                return window_start
+        
+        # Every gap before the first long-enough one is too short, so the
+        # first match is the earliest slot if it still fits in the window.
+        j = self._first_gap(i, minutes)
+        candidate = self.busy_ends[j] if j is not None else self.busy_ends[-1]
+        return candidate if candidate + length <= window_end else None
+
+# ------------------ Analytics ------------------
+# Tasks and activities are turned into NumPy columns once per render, and every
+# statistic below is a handful of vectorized operations over those arrays.
+PRIORITIES = ["Low", "Medium", "High"]
+
+def task_columns(tasks: list) -> dict:
+    n = len(tasks)
+    minutes = np.fromiter((t["Time"].hour * 60 + t["Time"].minute for t in tasks), dtype=np.int64, count=n)
+    day = np.array([t["Date"] for t in tasks], dtype="datetime64[D]")
+    return {
+        "day": day,
+        "due": day.astype("datetime64[m]") + minutes.astype("timedelta64[m]"),
+        "reminder": np.fromiter((int(t.get("ReminderMinutes", 0) or 0) for t in tasks), dtype=np.int64, count=n),
+        "priority": np.fromiter((PRIORITIES.index(t.get("Priority", "Medium")) for t in tasks), dtype=np.int8, count=n),
+        "done": np.fromiter((t.get("Status") == "Done" for t in tasks), dtype=bool, count=n),
+        "completed": np.array([t.get("CompletedAt") or "NaT" for t in tasks], dtype="datetime64[m]"),
+    }
+
+def activity_columns(activities: list) -> dict:
+    return {
+        "day": np.array([a["Date"] for a in activities], dtype="datetime64[D]"),
+        "duration": np.fromiter((int(a.get("Duration", 0) or 0) for a in activities), dtype=np.int64, count=len(activities)),
+    }
+
+@st.cache_data(show_spinner=False)
+def archived_columns(kind: str, segments: tuple) -> dict:
+    """Columns for archived items; segments only change when items are archived or restored"""
+    archive = {"segments": {kind: list(segments)}}
+    items = [x for seg in range(len(segments)) for x in read_segment(archive, kind, seg) if x is not None]
+    return task_columns(items) if kind == "tasks" else activity_columns(items)
+
+def concat_columns(*parts: dict) -> dict:
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+def week_start(day: np.ndarray) -> np.ndarray:
+    """Monday of each day's week (1970-01-01 was a Thursday)"""
+    return day - ((day.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+
+def completion_by_week(cols: dict):
+    weeks, inverse = np.unique(week_start(cols["day"]), return_inverse=True)
+    total = np.bincount(inverse, minlength=len(weeks))
+    done = np.bincount(inverse, weights=cols["done"], minlength=len(weeks))
+    return weeks, done / np.maximum(total, 1), total
+
+def completion_timeliness(cols: dict) -> dict:
+    """Completed tasks split by when they were finished relative to their reminder"""
+    finished = cols["done"] & ~np.isnat(cols["completed"])
+    completed = cols["completed"][finished]
+    due = cols["due"][finished]
+    remind_at = due - cols["reminder"][finished].astype("timedelta64[m]")
+    early = completed <= remind_at
+    on_time = ~early & (completed <= due)
+    return {
+        "Before reminder": int(np.count_nonzero(early)),
+        "In reminder window": int(np.count_nonzero(on_time)),
+        "Late": int(np.count_nonzero(~early & ~on_time)),
+    }
+
+def minutes_by_day(cols: dict):
+    days, inverse = np.unique(cols["day"], return_inverse=True)
+    return days, np.bincount(inverse, weights=cols["duration"], minlength=len(days))
+
+def priority_breakdown(cols: dict):
+    total = np.bincount(cols["priority"], minlength=len(PRIORITIES))
+    done = np.bincount(cols["priority"], weights=cols["done"], minlength=len(PRIORITIES)).astype(np.int64)
+    return total, done
+
+# ------------------ Notifications ------------------
+NOTIFY_MIN_INTERVAL_SECS = 60   # at most one reminder digest per minute
+NOTIFY_DIGEST_LINES = 5         # items listed in a digest before "...and N more"
+NOTIFIED_TTL = timedelta(days=2)  # how long a delivered reminder is remembered
+
+def send_notification(title: str, body: str):
+    """Deliver one browser notification and, if enabled, one desktop notification"""
     # Browser notification
     title_js = json.dumps(title)
     opts_js = json.dumps({"body": body, "icon": "https://cdn-icons-png.flaticon.com/512/3652/3652191.png"})
@@ -373,7 +1588,7 @@ def notify(title: str, body: str, item_id=None):
       }};
     }}catch(e){{}} 
   }}
-  if (Notification.permentission === "granted") {{ send(); }}
+  if (Notification.permission === "granted") {{ send(); }}
   else if (Notification.permission !== "denied") {{
     Notification.requestPermission().then(p => {{ if (p === "granted") send(); }});
   }}
@@ -388,6 +1603,72 @@ def notify(title: str, body: str, item_id=None):
         except: 
             pass
 
+def notify(title: str, body: str):
+    # Reminders go through NotificationDispatcher, which does the deduplication
+    send_notification(title, body)
+
+def reminder_key(item: dict) -> str:
+    """Dedup key for a reminder; rescheduling an item gives it a new key"""
+    return f"{item.get('id')}@{item['Date']}T{item['Time'].strftime('%H:%M')}"
+
+class NotificationDispatcher:
+    """Batches due reminders into digests, rate-limits delivery and remembers
+    delivered reminders until they expire.
+
+    All state lives in the containers passed in, so it can be kept in session
+    state and persisted; `send` is any callable taking (title, body).
+    """
+
+    def __init__(self, send, delivered: dict, pending: list, last_sent=None,
+                 min_interval: int = NOTIFY_MIN_INTERVAL_SECS, digest_lines: int = NOTIFY_DIGEST_LINES,
+                 ttl: timedelta = NOTIFIED_TTL):
+        self.send = send
+        self.delivered = delivered  # reminder key -> ISO expiry time
+        self.pending = pending      # [reminder key, message line] waiting for the next digest
+        self.last_sent = last_sent
+        self.min_interval = timedelta(seconds=min_interval)
+        self.digest_lines = digest_lines
+        self.ttl = ttl
+
+    def expire(self, now: datetime):
+        """Forget delivered reminders whose expiry has passed"""
+        for key in [k for k, exp in self.delivered.items() if datetime.fromisoformat(exp) <= now]:
+            del self.delivered[key]
+
+    def enqueue(self, item: dict) -> bool:
+        """Queue a reminder for item unless it was already queued or delivered"""
+        key = reminder_key(item)
+        if key in self.delivered or any(k == key for k, _ in self.pending):
+            return False
+        self.pending.append([key, f"{item.get('Title', '')} at {item['Time'].strftime('%H:%M')}"])
+        return True
+
+    def flush(self, now: datetime, due_keys: set) -> list:
+        """Send everything queued as one digest if the rate limit allows.
+        Entries whose key is not in due_keys (the item was completed, deleted
+        or rescheduled while waiting) are dropped first.
+        Returns the reminder keys that were delivered."""
+        self.pending[:] = [entry for entry in self.pending if entry[0] in due_keys]
+        if not self.pending:
+            return []
+        if self.last_sent is not None and now - self.last_sent < self.min_interval:
+            return []
+        
+        lines = [line for _, line in self.pending]
+        title = "⏰ Reminder" if len(lines) == 1 else f"⏰ {len(lines)} reminders"
+        body = "\n".join(lines[:self.digest_lines])
+        if len(lines) > self.digest_lines:
+            body += f"\n...and {len(lines) - self.digest_lines} more"
+        self.send(title, body)
+        
+        sent = [key for key, _ in self.pending]
+        expiry = (now + self.ttl).isoformat()
+        for key in sent:
+            self.delivered[key] = expiry
+        self.pending.clear()
+        self.last_sent = now
+        return sent
+
 # ------------------ Background Notification System ------------------
 def setup_background_notifications():
     """Set up the background notification system"""
@@ -462,7 +1743,7 @@ with st.sidebar:
     st.title("Planner Controls")
     ss.theme = st.radio("Theme", ["Dark","Light"], index=0 if ss.theme=="Dark" else 1)
     st.markdown("---")
-    page = st.radio("Page", ["Dashboard","Tasks","Activities","Habits","Notes","Summarizer","Calendar"], index=0)
+    page = st.radio("Page", ["Dashboard","Analytics","Tasks","Activities","Habits","Notes","Summarizer","Calendar","Archive","History"], index=0)
    
     st.markdown("---")
     ss.auto_refresh = st.checkbox("Enable Auto-refresh", value=ss.auto_refresh)
@@ -471,14 +1752,70 @@ with st.sidebar:
     ss.desktop_notify = st.checkbox("Enable Desktop Notifications", value=ss.desktop_notify, disabled=not PLYER_AVAILABLE)
     ss.bg_notify_enabled = st.checkbox("Enable Background Notifications", value=ss.bg_notify_enabled, 
                                       help="Notifications will work even when tab is in background")
+    ss.api_enabled = st.checkbox("Enable Local API", value=ss.api_enabled,
+                                 help=f"JSON API for scripts at http://{API_HOST}:{API_PORT}/api")
     
     # Data management section
     st.markdown("---")
     st.subheader("Data Management")
     
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("↩️ Undo", disabled=not ss.history.can_undo()):
+            collections, ss.archive = ss.history.undo()
+            for kind, items in collections.items():
+                ss[kind] = items
+            save_to_local_storage()
+            st.rerun()
+    with col2:
+        if st.button("↪️ Redo", disabled=not ss.history.can_redo()):
+            collections, ss.archive = ss.history.redo()
+            for kind, items in collections.items():
+                ss[kind] = items
+            save_to_local_storage()
+            st.rerun()
+    
     if st.button("Force Save Data"):
+        if save_to_local_storage():
+            st.success("Data saved to browser storage!")
+    
+    ss.archive_after_days = st.number_input("Archive items older than (days)", min_value=0, max_value=3650,
+                                            value=int(ss.archive_after_days), help="0 turns archiving off")
+    
+    if ss.storage_usage:
+        usage_ratio = ss.storage_usage / STORAGE_QUOTA_BYTES
+        st.progress(min(usage_ratio, 1.0), text=f"Storage: {ss.storage_usage / 1024:.0f} KB of {STORAGE_QUOTA_BYTES // 1024 // 1024} MB")
+        if usage_ratio > 0.8:
+            st.warning("Browser storage is almost full.")
+
+# ------------------ Local API Sync ------------------
+api_server = get_api_server()
+if ss.api_enabled:
+    api_server.acquire(ss.api_session)
+    if api_server.error:
+        st.sidebar.error(f"Local API failed to start: {api_server.error}")
+    elif ss.api_revision is None and api_server.store.revision == 0:
+        # First session to turn the API on seeds it
+        ss.api_revision = api_server.store.publish({kind: ss[kind] for kind in API_PREFIXES})
+    elif api_server.store.revision != ss.api_revision:
+        # Pick up changes made through the API or by another session
+        ss.api_revision, collections = api_server.store.snapshot()
+        for n in collections["notes"]:
+            # Bodies we published unchanged stay lazy
+            current = find_item(ss.notes, n["id"])
+            if current is not None and "Note" not in current and n.get("Note") == note_body(current):
+                del n["Note"]
+            elif current is not None and n.get("Note") != note_body(current):
+                # Edited through the API; cached text and summary are stale
+                ss.setdefault("note_bodies", {}).pop(str(n["id"]), None)
+                ss.setdefault("note_summaries", {}).pop(str(n["id"]), None)
+        for kind, items in collections.items():
+            ss[kind] = items
         save_to_local_storage()
-        st.success("Data saved to browser storage!")
+    st.sidebar.caption(f"API: http://{API_HOST}:{api_server.port}/api")
+elif api_server.release(ss.api_session):
+    # Other sessions may still be using it; it only stops with the last one
+    ss.api_revision = None
 
 # Apply theme
 st.markdown(DARK_CSS if ss.theme=="Dark" else LIGHT_CSS, unsafe_allow_html=True)
@@ -498,6 +1835,12 @@ if page == "Dashboard":
     with col3:
         st.metric("Pending", len([t for t in today_tasks if t.get("Status") == "Pending"]))
     
+    # Items created this week, found by range scan on their time-ordered ids
+    week_ago = datetime.now() - timedelta(days=7)
+    added = {kind: len(created_between(ss[kind], API_PREFIXES[kind], week_ago, datetime.now() + timedelta(seconds=1)))
+             for kind in ("tasks", "activities", "notes")}
+    st.caption("Added in the last 7 days: " + " · ".join(f"{n} {kind}" for kind, n in added.items()))
+    
     # Upcoming tasks
     st.markdown("### ⏰ Upcoming Tasks")
     upcoming_tasks = sorted([t for t in ss.tasks if t["Date"] >= date.today() and t.get("Status") == "Pending"], 
@@ -517,19 +1860,64 @@ if page == "Dashboard":
     if recent_notes:
         for note in recent_notes:
             st.markdown(f"<div class='card'><strong>{note.get('Date', '')}</strong><br>"
-                       f"{summarize_any_text(note.get('Note', ''))}</div>", 
+                       f"{note_summary(note)}</div>", 
                        unsafe_allow_html=True)
     else:
         st.info("No recent notes.")
         
 
+elif page == "Analytics":
+    st.title("📈 Analytics")
+    started = time.perf_counter()
+    
+    # Hot items plus everything in the archive
+    tasks_cols = concat_columns(task_columns(ss.tasks), archived_columns("tasks", tuple(ss.archive["segments"].get("tasks", []))))
+    activity_cols = concat_columns(activity_columns(ss.activities),
+                                   archived_columns("activities", tuple(ss.archive["segments"].get("activities", []))))
+    
+    if not len(tasks_cols["day"]) and not len(activity_cols["day"]):
+        st.info("No history yet.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Tasks", len(tasks_cols["day"]))
+        with col2:
+            st.metric("Completed", int(np.count_nonzero(tasks_cols["done"])))
+        with col3:
+            st.metric("Hours scheduled", f"{activity_cols['duration'].sum() / 60:.1f}")
+        
+        st.markdown("### Completion rate by week")
+        weeks, rate, totals = completion_by_week(tasks_cols)
+        if len(weeks):
+            st.bar_chart({"Week": weeks.astype(str), "Completion %": (rate * 100).round(1)}, x="Week", y="Completion %")
+        
+        st.markdown("### On time vs. late")
+        timeliness = completion_timeliness(tasks_cols)
+        if sum(timeliness.values()):
+            st.bar_chart({"When": list(timeliness), "Tasks": list(timeliness.values())}, x="When", y="Tasks")
+        else:
+            st.info("Completion times are recorded for tasks marked Done from now on.")
+        
+        st.markdown("### Time allocated per day")
+        days, minutes = minutes_by_day(activity_cols)
+        if len(days):
+            st.bar_chart({"Day": days.astype(str), "Hours": (minutes / 60).round(2)}, x="Day", y="Hours")
+        else:
+            st.info("No activities.")
+        
+        st.markdown("### Priority breakdown")
+        total, done = priority_breakdown(tasks_cols)
+        st.bar_chart({"Priority": PRIORITIES, "Done": done, "Open": total - done}, x="Priority", y=["Done", "Open"])
+    
+    st.caption(f"Computed in {(time.perf_counter() - started) * 1000:.0f} ms")
+
 elif page == "Tasks":
     st.title("✅ Tasks")
     
     # Check if we're in edit mode
     if ss.editing_id and ss.editing_item_type == "task":
         # Find the task being edited
-        task_to_edit = next((t for t in ss.tasks if t["id"] == ss.editing_id), None)
+        task_to_edit = find_item(ss.tasks, ss.editing_id)
         
         if task_to_edit:
             st.subheader("Edit Task")
@@ -537,7 +1925,7 @@ elif page == "Tasks":
             
             if result is not None:
                 # Update the task
-                index = next(i for i, t in enumerate(ss.tasks) if t["id"] == ss.editing_id)
+                index = find_index(ss.tasks, ss.editing_id)
                 ss.tasks[index] = result
                 ss.editing_id = None
                 ss.editing_item_type = None
@@ -584,7 +1972,7 @@ elif page == "Tasks":
                     st.rerun()
             with cols[2]:
                 if st.button("Done", key=f"done_{t['id']}"):
-                    t["Status"]="Done"; notify("Task Completed", t["Title"]); 
+                    t["Status"]="Done"; t["CompletedAt"]=datetime.now().isoformat(timespec="minutes"); notify("Task Completed", t["Title"]); 
                     save_to_local_storage()  # Save after completing
                     st.rerun()
             with cols[3]:
@@ -596,23 +1984,33 @@ elif page == "Tasks":
 elif page == "Activities":
     st.title("🎯 Activities")
     
+    # Built once per run; adding or editing saves and reruns, which rebuilds it
+    schedule = ScheduleIndex(scheduled_items(ss.activities, ss.tasks))
+    
+    # Messages from the add or edit that triggered this run
+    for level, message in ss.pop("activity_messages", []):
+        getattr(st, level)(message)
+    
     # Check if we're in edit mode
     if ss.editing_id and ss.editing_item_type == "activity":
         # Find the activity being edited
-        activity_to_edit = next((a for a in ss.activities if a["id"] == ss.editing_id), None)
+        activity_to_edit = find_item(ss.activities, ss.editing_id)
         
         if activity_to_edit:
             st.subheader("Edit Activity")
             result = edit_form("activity", activity_to_edit)
             
             if result is not None:
+                clashes = schedule.overlapping(*item_interval(result), exclude_id=result["id"])
                 # Update the activity
-                index = next(i for i, a in enumerate(ss.activities) if a["id"] == ss.editing_id)
+                index = find_index(ss.activities, ss.editing_id)
                 ss.activities[index] = result
                 ss.editing_id = None
                 ss.editing_item_type = None
                 save_to_local_storage()  # Save after editing
-                st.success("Activity updated!")
+                ss.activity_messages = [("success", "Activity updated!")]
+                if clashes:
+                    ss.activity_messages.append(("warning", "Overlaps with: " + ", ".join(c.get("Title", "") for c in clashes)))
                 st.rerun()
             elif result is None and ss.editing_id:
                 # Cancel edit mode
@@ -631,20 +2029,40 @@ elif page == "Activities":
         a_duration = st.number_input("Duration (minutes)", min_value=1, max_value=1440, value=60, key="a_duration")
         if st.button("Add Activity", key="btn_add_activity"):
             if a_title.strip():
-                ss.activities.append({"id": gen_id("activity"), "Title": a_title.strip(), "Date": a_date, 
-                                    "Time": a_time, "Duration": a_duration})
+                new_activity = {"id": gen_id("activity"), "Title": a_title.strip(), "Date": a_date, 
+                                "Time": a_time, "Duration": a_duration}
+                clashes = schedule.overlapping(*item_interval(new_activity))
+                ss.activities.append(new_activity)
                 save_to_local_storage()  # Save after adding
-                st.success("Activity added.")
+                ss.activity_messages = [("success", "Activity added.")]
+                if clashes:
+                    ss.activity_messages.append(("warning", "Overlaps with: " + ", ".join(c.get("Title", "") for c in clashes)))
+                st.rerun()
+    
+    # Free slot finder
+    with st.expander("🔍 Find a free slot"):
+        f_date = st.date_input("Date", value=date.today(), key="f_date")
+        f_from = st.time_input("From", value=dtime(9, 0), key="f_from")
+        f_to = st.time_input("To", value=dtime(17, 0), key="f_to")
+        f_minutes = st.number_input("Length (minutes)", min_value=5, max_value=MAX_DURATION_MINUTES, value=60, key="f_minutes")
+        if st.button("Find Slot", key="btn_find_slot"):
+            slot = schedule.free_slot(int(f_minutes), datetime.combine(f_date, f_from), datetime.combine(f_date, f_to))
+            if slot:
+                st.success(f"Next free slot: {slot.strftime('%Y-%m-%d %H:%M')} – {(slot + timedelta(minutes=int(f_minutes))).strftime('%H:%M')}")
+            else:
+                st.info("No free slot of that length in this window.")
     
     st.markdown("### Your activities")
     activities_to_show = filter_items(ss.activities)
     if not activities_to_show:
         st.info("No activities.")
     else:
+        conflicts = schedule.conflicts()
         for a in sorted(activities_to_show, key=lambda x:(x["Date"],x["Time"])):
             cols = st.columns([0.5, 0.15, 0.15, 0.2])
             with cols[0]:
-                st.markdown(f"**{a['Title']}**<br><span class='small'>📅 {a['Date']} ⏰ {a['Time'].strftime('%H:%M')} · Duration: {a['Duration']} min</span>", unsafe_allow_html=True)
+                clash_note = f"<br><span class='due'>⚠️ Overlaps with: {', '.join(conflicts[a['id']])}</span>" if a["id"] in conflicts else ""
+                st.markdown(f"**{a['Title']}**<br><span class='small'>📅 {a['Date']} ⏰ {a['Time'].strftime('%H:%M')} · Duration: {a['Duration']} min</span>{clash_note}", unsafe_allow_html=True)
             with cols[1]:
                 if st.button("Edit", key=f"edit_{a['id']}"):
                     ss.editing_id = a["id"]
@@ -667,7 +2085,7 @@ elif page == "Habits":
     # Check if we're in edit mode
     if ss.editing_id and ss.editing_item_type == "habit":
         # Find the habit being edited
-        habit_to_edit = next((h for h in ss.habits if h["id"] == ss.editing_id), None)
+        habit_to_edit = find_item(ss.habits, ss.editing_id)
         
         if habit_to_edit:
             st.subheader("Edit Habit")
@@ -675,7 +2093,7 @@ elif page == "Habits":
             
             if result is not None:
                 # Update the habit
-                index = next(i for i, h in enumerate(ss.habits) if h["id"] == ss.editing_id)
+                index = find_index(ss.habits, ss.editing_id)
                 ss.habits[index] = result
                 ss.editing_id = None
                 ss.editing_item_type = None
@@ -727,15 +2145,16 @@ elif page == "Notes":
     # Check if we're in edit mode
     if ss.editing_id and ss.editing_item_type == "note":
         # Find the note being edited
-        note_to_edit = next((n for n in ss.notes if n["id"] == ss.editing_id), None)
+        note_to_edit = find_item(ss.notes, ss.editing_id)
         
         if note_to_edit:
             st.subheader("Edit Note")
             result = edit_form("note", note_to_edit)
             
             if result is not None:
+                result["Summary"] = summarize_any_text(result["Note"])
                 # Update the note
-                index = next(i for i, n in enumerate(ss.notes) if n["id"] == ss.editing_id)
+                index = find_index(ss.notes, ss.editing_id)
                 ss.notes[index] = result
                 ss.editing_id = None
                 ss.editing_item_type = None
@@ -757,7 +2176,8 @@ elif page == "Notes":
         n_date = st.date_input("Date", value=date.today(), key="n_date")
         if st.button("Add Note", key="btn_add_note"):
             if n_note.strip():
-                ss.notes.append({"id": gen_id("note"), "Note": n_note.strip(), "Date": n_date})
+                ss.notes.append({"id": gen_id("note"), "Note": n_note.strip(), "Date": n_date,
+                                 "Summary": summarize_any_text(n_note.strip())})
                 save_to_local_storage()  # Save after adding
                 st.success("Note added.")
     
@@ -769,7 +2189,7 @@ elif page == "Notes":
         for n in notes_to_show:
             cols = st.columns([0.7, 0.15, 0.15])
             with cols[0]:
-                st.markdown(f"<div class='card'><strong>{n.get('Date', '')}</strong><br>{summarize_any_text(n.get('Note', ''))}</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='card'><strong>{n.get('Date', '')}</strong><br>{note_summary(n)}</div>", unsafe_allow_html=True)
             with cols[1]:
                 if st.button("Edit", key=f"edit_{n['id']}"):
                     ss.editing_id = n["id"]
@@ -802,10 +2222,40 @@ elif page == "Summarizer":
     # Summarize button
     if st.button("Summarize Text", type="primary"):
         if ss.summarizer_text.strip():
-            ss.summarizer_result = summarize_any_text(ss.summarizer_text, max_sentences, max_length)
+            # Run in the background so the page stays responsive
+            if ss.summarizer_job:
+                ss.summarizer_job.cancel()
+            ss.summarizer_error = ""
+            ss.summarizer_job = submit_summary(ss.summarizer_text, max_sentences, max_length)
         else:
             st.warning("Please enter some text to summarize.")
     
+    def show_summary_job():
+        job = ss.summarizer_job
+        if job is None:
+            return
+        if job.future.done():
+            # Publish the result on the script thread
+            ss.summarizer_job = None
+            error = None if job.future.cancelled() else job.future.exception()
+            if error is None and not job.future.cancelled():
+                ss.summarizer_result = job.future.result()
+            elif error is not None and not isinstance(error, CancelledError):
+                ss.summarizer_error = f"Summarizing failed: {error}"
+            st.rerun()
+        st.progress(job.progress, text="Summarizing...")
+        if st.button("Cancel", key="cancel_summary"):
+            job.cancel()
+            ss.summarizer_job = None
+            st.rerun()
+    
+    # Poll the job without blocking the rest of the page
+    if hasattr(st, "fragment"):
+        show_summary_job = st.fragment(run_every=1)(show_summary_job)
+    show_summary_job()
+    if ss.summarizer_error:
+        st.error(ss.summarizer_error)
+    
     # Display result
     if ss.summarizer_result:
         st.markdown("### Summary")
@@ -882,16 +2332,104 @@ elif page == "Calendar":
                                f"</div>", unsafe_allow_html=True)
                     
                     day_counter += 1
+
+elif page == "Archive":
+    st.title("🗄️ Archive")
+    st.markdown(f"Completed tasks, past activities and notes older than {ss.archive_after_days} days are archived automatically.")
+    
+    counts = {kind: 0 for kind in ARCHIVE_KINDS}
+    for row in ss.archive["index"]:
+        counts[row[0]] = counts.get(row[0], 0) + 1
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Tasks", counts["tasks"])
+    with col2:
+        st.metric("Activities", counts["activities"])
+    with col3:
+        st.metric("Notes", counts["notes"])
+    
+    query = st.text_input("Search archive", key="archive_query")
+    if query.strip():
+        # Full-text search inflates segments on demand
+        results = [(kind, seg, pos, str(item.get("Date", "")), archive_label(item))
+                   for kind, seg, pos, item in search_archive(ss.archive, query)]
+    else:
+        # Without a query only the uncompressed index is needed
+        results = [(row[0], row[1], row[5], row[3], row[4])
+                   for row in sorted(ss.archive["index"], key=lambda r: r[3], reverse=True)[:20]]
+    
+    if not results:
+        st.info("Nothing archived." if not query.strip() else "No matches.")
+    for kind, seg, pos, item_date, label in results:
+        cols = st.columns([0.85, 0.15])
+        with cols[0]:
+            st.markdown(f"**{label}**<br><span class='small'>{kind[:-1].title()} · 📅 {item_date}</span>", unsafe_allow_html=True)
+        with cols[1]:
+            # Keyed by slot: archives from before unique ids can hold duplicate ids
+            if st.button("Restore", key=f"restore_{kind}_{seg}_{pos}"):
+                item = restore_archived(ss.archive, kind, seg, pos)
+                if item is not None:
+                    item["Unarchived"] = True
+                    insert_by_id(ss[kind], item)
+                    save_to_local_storage()  # Save after restoring
+                st.rerun()
+
+elif page == "History":
+    st.title("🕘 History")
+    st.markdown(f"The last {ss.history.limit} changes are kept for this session.")
+    
+    if not ss.history.versions:
+        st.info("No history yet.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            h_date = st.date_input("View data as of", value=date.today(), key="h_date")
+        with col2:
+            h_time = st.time_input("Time", value=datetime.now().time().replace(second=0, microsecond=0), key="h_time")
+        pos = ss.history.as_of(datetime.combine(h_date, h_time).replace(second=59, microsecond=999999))
+        if pos is None:
+            st.info("No history recorded before that time.")
+        else:
+            when, label = ss.history.versions[pos][:2]
+            st.markdown(f"<div class='card'><strong>{when.strftime('%Y-%m-%d %H:%M:%S')}</strong><br>"
+                        f"<span class='small'>{label}</span></div>", unsafe_allow_html=True)
+            snapshot, _ = ss.history.materialize(pos)
+            h_kind = st.radio("Collection", list(HISTORY_KINDS), horizontal=True, key="h_kind")
+            if snapshot[h_kind]:
+                st.dataframe([{k: str(v) for k, v in item.items()} for item in snapshot[h_kind]], use_container_width=True)
+            else:
+                st.info(f"No {h_kind}.")
+        
+        st.markdown("### Changes")
+        for i in range(len(ss.history.versions) - 1, -1, -1):
+            when, label = ss.history.versions[i][:2]
+            marker = " ← current" if i == ss.history.cursor else ""
+            st.markdown(f"<span class='small'>{when.strftime('%H:%M:%S')}</span> {label}{marker}", unsafe_allow_html=True)
 # ------------------ Setup Background Notifications ------------------
 setup_background_notifications()
 
 # ------------------ Check for Due Notifications ------------------
-for item in ss.tasks+ss.activities:
-    if due_soon(item):
-        notify("⏰ Reminder", f"{item.get('Title','')} at {item['Time'].strftime('%H:%M')}", item.get("id"))
-        item["Status"]="Notified"
+now = datetime.now()
+dispatcher = NotificationDispatcher(send_notification, ss.notified, ss.notify_pending, ss.notify_last_sent)
+dispatcher.expire(now)
+due_items = [item for item in ss.tasks+ss.activities if due_soon(item)]
+for item in due_items:
+    dispatcher.enqueue(item)
+delivered = set(dispatcher.flush(now, {reminder_key(item) for item in due_items}))
+if delivered:
+    for item in due_items:
+        if reminder_key(item) in delivered:
+            item["Status"]="Notified"
+    ss.notify_last_sent = dispatcher.last_sent
+    save_to_local_storage()  # Persist delivered reminders so a reload doesn't repeat them
 
 # Auto-refresh
 if ss.auto_refresh:
     st.markdown(f"<meta http-equiv='refresh' content='{ss.auto_refresh_secs}'>", unsafe_allow_html=True)
-    st.markdown(f"<div class='small'>Auto-refreshing every {ss.auto_refresh_secs} seconds...</div>", unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(f"<div class='small'>Auto-refreshing every {ss.auto_refresh_secs} seconds...</div>", unsafe_allow_html=True)
+
+# Without st.fragment (older Streamlit) a running summary is polled by
+# rerunning the whole page once everything else has run
+if ss.summarizer_job is not None and not hasattr(st, "fragment"):
+    time.sleep(1)
+    st.rerun()
\ No newline at end of file